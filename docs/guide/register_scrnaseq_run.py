@@ -1,10 +1,25 @@
 import argparse
 import lamindb as ln
 import json
+import os
 import re
+from collections.abc import Iterator
+from datetime import datetime
+from fnmatch import fnmatch
 from pathlib import Path
+from django.db import transaction
 from lamin_utils import logger
 
+_META_RE = re.compile(rb'run id \[(?P<run_id>[^\]]+)\]|<span id="workflow_complete">(?P<done>[^<]+)</span>')
+
+# the files read from the 'pipeline_info' folder and their glob patterns
+_PIPELINE_INFO_PATTERNS = {
+    "run_id_html": "execution_report_*.html",
+    "execution_report": "execution_report*",
+    "software": "nf_core_*_software*",
+    "params": "params*",
+}
+
 
 def parse_arguments() -> argparse.Namespace:
     parser = argparse.ArgumentParser()
@@ -13,73 +28,146 @@ def parse_arguments() -> argparse.Namespace:
     return parser.parse_args()
 
 
+def _iter_files(root: str) -> Iterator[str]:
+    """Yield the paths of all files below `root`, walking directories with an explicit stack."""
+    stack = [root]
+    while stack:
+        with os.scandir(stack.pop()) as it:
+            for entry in it:
+                # like `from_dir`, don't descend into symlinked directories
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.is_file():
+                    yield entry.path
+
+
 def register_pipeline_io(input_dir: str, output_dir: str, run: ln.Run) -> None:
     """Register input and output artifacts for an `nf-core/scrnaseq` run."""
-    input_artifacts = ln.Artifact.from_dir(input_dir, run=False)
-    ln.save(input_artifacts)
+    # enumerate the input folder ourselves rather than via `ln.Artifact.from_dir()`;
+    # the walker only yields existing regular files, so skip the existence check as `from_dir` does
+    folder_key = Path(input_dir).name
+    input_artifacts_by_hash = {}
+    # sort so that the same duplicate is kept on every run, independent of the walk order
+    for path in sorted(_iter_files(input_dir)):
+        artifact = ln.Artifact(
+            path,
+            key=f"{folder_key}/{os.path.relpath(path, input_dir)}",
+            run=False,
+            skip_check_exists=True,
+        )
+        # as in `from_dir`, keep only the first of several files with identical content
+        if artifact.hash in input_artifacts_by_hash:
+            kept_path = input_artifacts_by_hash[artifact.hash].key
+            logger.warning(f"Not registering {path}: it has the same content as {kept_path}")
+            continue
+        input_artifacts_by_hash[artifact.hash] = artifact
+    input_artifacts = list(input_artifacts_by_hash.values())
+    output_artifacts = [
+        ln.Artifact(f"{output_dir}/multiqc", description="multiqc report", run=run),
+        ln.Artifact(
+            f"{output_dir}/star/mtx_conversions/combined_filtered_matrix.h5ad",
+            key="filtered_count_matrix.h5ad",
+            run=run,
+        ),
+    ]
+    # save inputs and outputs in one batch rather than one round-trip per artifact
+    ln.save(input_artifacts + output_artifacts)
     run.input_artifacts.set(input_artifacts)
-    ln.Artifact(f"{output_dir}/multiqc", description="multiqc report", run=run).save()
-    ln.Artifact(
-        f"{output_dir}/star/mtx_conversions/combined_filtered_matrix.h5ad",
-        key="filtered_count_matrix.h5ad",
-        run=run,
-    ).save()
+
+
+def _find_pipeline_info_files(pinfo: Path) -> dict[str, Path]:
+    """Return the first file matching each of `_PIPELINE_INFO_PATTERNS`, listing the folder only once."""
+    files = {}
+    with os.scandir(pinfo) as it:
+        for entry in it:
+            for category, pattern in _PIPELINE_INFO_PATTERNS.items():
+                if category not in files and fnmatch(entry.name, pattern):
+                    files[category] = Path(entry.path)
+    return files
+
+
+def _read_report_metadata(report_path: Path) -> tuple[str, str]:
+    """Return the nextflow run id and completion timestamp of an execution report."""
+    # one pass of a bytes regex over the raw report, stopping once both values are found
+    nextflow_id, timestamp_str = "", ""
+    for match in _META_RE.finditer(report_path.read_bytes()):
+        if match.group("run_id") and not nextflow_id:
+            nextflow_id = match.group("run_id").decode()
+        if match.group("done") and not timestamp_str:
+            timestamp_str = match.group("done").decode().strip()
+        if nextflow_id and timestamp_str:
+            break
+    return nextflow_id, timestamp_str
+
+
+def _get_or_create_ulabel(name: str) -> tuple[ln.ULabel, bool]:
+    """Return the ULabel called `name` and whether it still needs to be saved."""
+    ulabel = ln.ULabel.filter(name=name).first()
+    if ulabel is not None:
+        return ulabel, False
+    return ln.ULabel(name=name), True
 
 
 def register_pipeline_metadata(output_dir: str, run: ln.Run) -> None:
     """Register nf-core run metadata stored in the 'pipeline_info' folder."""
-    ulabel = ln.ULabel(name="nextflow").save()
-    run.transform.ulabels.add(ulabel)
+    pinfo = Path(output_dir) / "pipeline_info"
+    files = _find_pipeline_info_files(pinfo)
 
-    # nextflow run id
-    content = next(Path(f"{output_dir}/pipeline_info").glob("execution_report_*.html")).read_text()
-    match = re.search(r"run id \[([^\]]+)\]", content)
-    nextflow_id = match.group(1) if match else ""
+    # nextflow run id and completion time
+    nextflow_id, timestamp_str = _read_report_metadata(files["run_id_html"])
     run.reference = nextflow_id
     run.reference_type = "nextflow_id"
 
     # completed at
-    completion_match = re.search(r'<span id="workflow_complete">([^<]+)</span>', content)
-    if completion_match:
-        from datetime import datetime
-
-        timestamp_str = completion_match.group(1).strip()
+    if timestamp_str:
         run.finished_at = datetime.strptime(timestamp_str, "%d-%b-%Y %H:%M:%S")
 
     # execution report and software versions
-    for file_pattern, description, run_attr in [
-        ("execution_report*", "execution report", "report"),
-        ("nf_core_*_software*", "software versions", "environment"),
+    run_artifacts = {}
+    for category, description, run_attr in [
+        ("execution_report", "execution report", "report"),
+        ("software", "software versions", "environment"),
     ]:
-        matching_files = list(Path(f"{output_dir}/pipeline_info").glob(file_pattern))
-        if not matching_files:
-            logger.warning(f"No files matching '{file_pattern}' in pipeline_info")
+        if category not in files:
+            logger.warning(f"No {description} file in pipeline_info")
             continue
 
-        artifact = ln.Artifact(
-            matching_files[0],
+        run_artifacts[run_attr] = ln.Artifact(
+            files[category],
             description=f"nextflow run {description} of {nextflow_id}",
             visibility=0,
             run=False,
-        ).save()
+        )
+
+    # save the run artifacts, the params feature and, if it doesn't exist yet, the "nextflow" ulabel
+    # in one batch; the ulabel has to be saved before it can be linked to the transform below
+    ulabel, ulabel_is_new = _get_or_create_ulabel("nextflow")
+    records = [*run_artifacts.values(), ln.Param(name="params", dtype="dict")]
+    if ulabel_is_new:
+        records.append(ulabel)
+    ln.save(records)
+    for run_attr, artifact in run_artifacts.items():
         setattr(run, run_attr, artifact)
 
     # nextflow run parameters
-    params_path = next(Path(f"{output_dir}/pipeline_info").glob("params*"))
-    with params_path.open() as params_file:
+    with files["params"].open() as params_file:
         params = json.load(params_file)
-    ln.Param(name="params", dtype="dict").save()
-    run.features.add_values({"params": params})
-    run.save()
-
-
-args = parse_arguments()
-scrnaseq_transform = ln.Transform(
-    key="scrna-seq",
-    version="4.0.0",
-    type="pipeline",
-    reference="https://github.com/nf-core/scrnaseq",
-).save()
-run = ln.Run(transform=scrnaseq_transform).save()
-register_pipeline_io(args.input, args.output, run)
-register_pipeline_metadata(args.output, run)
+
+    # link the ulabel, add the run parameters and save the run in a single transaction
+    with transaction.atomic():
+        run.transform.ulabels.add(ulabel)
+        run.features.add_values({"params": params})
+        run.save()
+
+
+if __name__ == "__main__":
+    args = parse_arguments()
+    scrnaseq_transform = ln.Transform(
+        key="scrna-seq",
+        version="4.0.0",
+        type="pipeline",
+        reference="https://github.com/nf-core/scrnaseq",
+    ).save()
+    run = ln.Run(transform=scrnaseq_transform).save()
+    register_pipeline_io(args.input, args.output, run)
+    register_pipeline_metadata(args.output, run)
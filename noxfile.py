@@ -1,5 +1,6 @@
 import os
 import shutil
+import tomllib
 from pathlib import Path
 
 import nox
@@ -8,15 +9,15 @@ from laminci.nox import build_docs, login_testuser1, run, run_pre_commit
 
 IS_CI = "CI" in os.environ
 
+# shared with tests/test_notebooks.py, which reads the same file
+GROUPS = tomllib.loads((Path(__file__).parent / "groups.toml").read_text())
+
 # we'd like to aggregate coverage information across sessions
 # and for this the code needs to be located in the same
 # directory in every github action runner
 # this also allows to break out an installation section
 nox.options.default_venv_backend = "none" if IS_CI else "uv"
 
-GROUPS = {}
-GROUPS["guide"] = ["guide.ipynb"]
-
 
 @nox.session
 def lint(session: nox.Session) -> None:
@@ -24,13 +25,7 @@ def lint(session: nox.Session) -> None:
 
 
 @nox.session
-@nox.parametrize(
-    "group",
-    [
-        "guide",
-    ],
-)
-def build(session, group):
+def build(session):
     session.run(
         "uv",
         "pip",
@@ -41,21 +36,23 @@ def build(session, group):
     session.run(*"pip install -e .[dev]".split())
     convert_executable_md_files("./docs")
     login_testuser1(session)
-    run(session, f"pytest -s ./tests/test_notebooks.py::test_{group}")
+    # a single pytest invocation covers all groups
+    run(session, "pytest -s ./tests/test_notebooks.py")
 
     # move artifacts into right place
-    target_dir = Path(f"./docs_{group}")
-    target_dir.mkdir(exist_ok=True)
-    for filename in GROUPS[group]:
-        shutil.copy(Path("docs") / filename, target_dir / filename)
+    for group, filenames in GROUPS.items():
+        target_dir = Path(f"./docs_{group}")
+        target_dir.mkdir(exist_ok=True)
+        for filename in filenames:
+            shutil.copy(Path("docs") / filename, target_dir / filename)
 
 
 @nox.session
 def docs(session):
-    for group in [
-        "guide",
-    ]:
-        for path in Path(f"./docs_{group}").glob("*"):
-            path.rename(f"./docs/{path.name}")
+    for group in GROUPS:
+        with os.scandir(f"./docs_{group}") as entries:
+            for entry in entries:
+                # plain os.rename avoids building a Path per scanned entry
+                os.rename(entry.path, f"./docs/{entry.name}")  # noqa: PTH104
     build_docs(session, strict=False)
     upload_docs_artifact(aws=True)
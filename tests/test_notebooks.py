@@ -1,9 +1,10 @@
+import tomllib
 from pathlib import Path
 
 import nbproject_test as test
-from noxfile import GROUPS
 
 DOCS = Path(__file__).parents[1] / "docs/"
+GROUPS = tomllib.loads((Path(__file__).parents[1] / "groups.toml").read_text())
 
 
 def test_guide():